@@ -1,35 +1,52 @@
 import random
+from types import MappingProxyType
+
+SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+
+# Points per rank; aces count 11 until add_card demotes them
+VALUES = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
+          '10': 10, 'J': 10, 'Q': 10, 'K': 10, 'A': 11}
+
+# Built once and shared by every deck, so the cards are read-only views:
+# a caller changing one can't leak the change into later decks
+DECK = tuple(MappingProxyType({'rank': rank, 'suit': suit})
+             for suit in SUITS for rank in RANKS)
 
 # Function to create a deck
 def create_deck():
-    suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
-    ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-    deck = [{'rank': rank, 'suit': suit} for suit in suits for rank in ranks]
-    random.shuffle(deck)
-    return deck
+    # shuffled copy of the shared cards in one call
+    return random.sample(DECK, len(DECK))
 
-# Function to calculate hand value
-def calculate_hand_value(hand):
-    value = 0
-    aces = 0
-    for card in hand:
-        if card['rank'] in ['J', 'Q', 'K']:
-            value += 10
-        elif card['rank'] == 'A':
-            value += 11
-            aces += 1
-        else:
-            value += int(card['rank'])
-    # Adjust for aces
+# Running total for a hand that only grows: `aces` counts the aces still
+# worth 11, so each new card is scored without rescanning the hand
+def add_card(value, aces, card):
+    rank = card['rank']
+    value += VALUES[rank]
+    aces += rank == 'A'
     while value > 21 and aces:
         value -= 10
         aces -= 1
-    return value
+    return value, aces
+
+# Score a whole hand card by card with add_card, so both scorers share
+# the ace handling; returns (value, aces still worth 11)
+def score_hand(hand):
+    value, aces = 0, 0
+    for card in hand:
+        value, aces = add_card(value, aces, card)
+    return value, aces
+
+# Function to calculate hand value
+def calculate_hand_value(hand):
+    return score_hand(hand)[0]
 
 # Function to display hand
-def display_hand(hand, name):
+def display_hand(hand, name, value=None):
+    if value is None:
+        value = calculate_hand_value(hand)
     cards = ', '.join(f"{card['rank']} of {card['suit']}" for card in hand)
-    print(f"{name}'s hand: {cards} (Value: {calculate_hand_value(hand)})")
+    print(f"{name}'s hand: {cards} (Value: {value})")
 
 # Game logic
 def blackjack():
@@ -37,18 +54,22 @@ def blackjack():
     
     player_hand = [deck.pop(), deck.pop()]
     dealer_hand = [deck.pop(), deck.pop()]
+    player_value, player_aces = score_hand(player_hand)
+    dealer_value, dealer_aces = score_hand(dealer_hand)
     
     # Show initial hands
-    display_hand(player_hand, "Player")
+    display_hand(player_hand, "Player", player_value)
     print(f"Dealer's hand: {dealer_hand[0]['rank']} of {dealer_hand[0]['suit']} and [Hidden]")
 
     # Player's turn
     while True:
         move = input("Do you want to Hit or Stand? (h/s): ").lower()
         if move == 'h':
-            player_hand.append(deck.pop())
-            display_hand(player_hand, "Player")
-            if calculate_hand_value(player_hand) > 21:
+            card = deck.pop()
+            player_hand.append(card)
+            player_value, player_aces = add_card(player_value, player_aces, card)
+            display_hand(player_hand, "Player", player_value)
+            if player_value > 21:
                 print("You busted! Dealer wins.")
                 return
         elif move == 's':
@@ -58,19 +79,18 @@ def blackjack():
     
     # Dealer's turn
     print("\nDealer reveals hand:")
-    display_hand(dealer_hand, "Dealer")
+    display_hand(dealer_hand, "Dealer", dealer_value)
     
-    while calculate_hand_value(dealer_hand) < 17:
-        dealer_hand.append(deck.pop())
-        display_hand(dealer_hand, "Dealer")
-        if calculate_hand_value(dealer_hand) > 21:
+    while dealer_value < 17:
+        card = deck.pop()
+        dealer_hand.append(card)
+        dealer_value, dealer_aces = add_card(dealer_value, dealer_aces, card)
+        display_hand(dealer_hand, "Dealer", dealer_value)
+        if dealer_value > 21:
             print("Dealer busted! You win!")
             return
     
     # Compare hands
-    player_value = calculate_hand_value(player_hand)
-    dealer_value = calculate_hand_value(dealer_hand)
-    
     if player_value > dealer_value:
         print("You win!")
     elif player_value < dealer_value:
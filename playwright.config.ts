@@ -1,11 +1,28 @@
 // playwright.config.ts
 import { defineConfig } from '@playwright/test';
 
+// Smoke tests in CI point BASE_URL at the deployed app; locally we boot Flask
+// ourselves and start as soon as /healthz answers instead of sleeping.
+const useLocalServer = !process.env.BASE_URL;
+
 export default defineConfig({
   timeout: 30000,
   testDir: 'e2e',
   use: {
     headless: true,
+    // One browser per worker is reused by every test; keep its startup lean on CI runners.
+    launchOptions: {
+      args: ['--no-sandbox', '--disable-dev-shm-usage'],
+    },
   },
   reporter: [['list']],
+  webServer: useLocalServer
+    ? {
+        // same server as the Dockerfile, threaded so parallel page requests don't queue
+        command: 'gunicorn -w 2 -k gthread --threads 4 -b 127.0.0.1:5000 app:app',
+        url: 'http://127.0.0.1:5000/healthz',
+        reuseExistingServer: true,
+        timeout: 15000,
+      }
+    : undefined,
 });
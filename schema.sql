@@ -25,3 +25,32 @@ CREATE TABLE action_log (
     details      TEXT,                       
     created_at   TEXT DEFAULT (CURRENT_TIMESTAMP)
 );
+
+CREATE TABLE user_stats (
+    user_id      INTEGER PRIMARY KEY,
+    wins         INTEGER NOT NULL DEFAULT 0,
+    losses       INTEGER NOT NULL DEFAULT 0,
+    pushes       INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE daily_stats (
+    day          TEXT PRIMARY KEY,           -- 'YYYY-MM-DD', finished days only
+    games        INTEGER NOT NULL DEFAULT 0,
+    new_users    INTEGER NOT NULL DEFAULT 0,
+    logins       INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE game_state (
+    user_id      INTEGER PRIMARY KEY,
+    state        TEXT NOT NULL               -- JSON: hands, remaining deck, message
+);
+
+CREATE INDEX ix_users_created ON users (created_at);
+
+CREATE INDEX ix_hh_user_result ON hand_history (user_id, result);
+CREATE INDEX ix_hh_user_created ON hand_history (user_id, timestamp);
+CREATE INDEX ix_hh_created ON hand_history (timestamp);
+CREATE INDEX ix_hh_result ON hand_history (result);
+
+CREATE INDEX ix_actionlog_action_created ON action_log (action, created_at);
+CREATE INDEX ix_actionlog_user_created ON action_log (user_id, created_at);
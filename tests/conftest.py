@@ -1,22 +1,26 @@
 # tests/conftest.py
 
 import os
-import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
 import pytest
+from argon2 import PasswordHasher
+from sqlalchemy import event
 
 # -----------------------------------------------
 # BEFORE importing app.py, override the DB
 # -----------------------------------------------
 #
-# We create a temporary SQLite file for ALL tests.
-# This ensures tests never touch your real blackjack.db.
+# ALL tests share one in-memory SQLite database (app.py pins it to a single
+# connection), so tests never touch your real blackjack.db or fsync a file.
 #
 
-db_fd, db_path = tempfile.mkstemp()
-os.environ.setdefault("DATABASE_URL", f"sqlite:///{db_path}")
-os.environ.setdefault("DB_DIR", os.path.dirname(db_path))  # ensures consistency
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# write game-route action logs synchronously so tests can assert on them
+os.environ.setdefault("ACTION_LOG_FLUSH_INTERVAL", "0")
 
-from app import app, db  # noqa: E402
+from app import app, db, cache  # noqa: E402
 
 
 # ---------------------------------------------------------
@@ -35,18 +39,40 @@ def setup_database():
         db.drop_all()
 
 
+# ---------------------------------------------------------
+# FAST PASSWORD HASHING (once per test session)
+# ---------------------------------------------------------
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hashing():
+    """
+    Test passwords are throwaway, so swap the production Argon2 cost for the
+    cheapest parameters argon2 accepts. Hashes are still real Argon2id, so
+    verify/rehash behave exactly as in production.
+    """
+    import app as app_module
+
+    production = app_module.password_hasher
+    app_module.password_hasher = PasswordHasher(
+        time_cost=1, memory_cost=8, parallelism=1
+    )
+    yield
+    app_module.password_hasher = production
+
+
 # ---------------------------------------------------------
 # APP FIXTURE (shared by both unit & integration tests)
 # ---------------------------------------------------------
-@pytest.fixture
+@pytest.fixture(scope="session")
 def test_app():
     """
-    Provide a configured Flask app for tests.
+    Provide a configured Flask app for tests, set up once per session.
     Ensures the app runs in TESTING mode and CSRF is disabled.
     """
     app.config.update(
         TESTING=True,
         WTF_CSRF_ENABLED=False,
+        # compile each template once; never stat() it again per render
+        TEMPLATES_AUTO_RELOAD=False,
     )
     return app
 
@@ -59,10 +85,25 @@ def client(test_app):
     """
     Provides a Flask test client for sending requests.
     Works for both unit and integration tests.
+    Stays per test: each client has its own cookie jar, so logins and
+    in-progress games never carry over between tests.
     """
     return test_app.test_client()
 
 
+# ---------------------------------------------------------
+# CACHE RESET (per test)
+# ---------------------------------------------------------
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Memoized dashboard aggregates must not leak between tests.
+    """
+    with app.app_context():
+        cache.clear()
+    yield
+
+
 # ---------------------------------------------------------
 # CLEAN DB SESSION FIXTURE (per test)
 # ---------------------------------------------------------
@@ -76,7 +117,8 @@ def db_session():
     with app.app_context():
         yield db.session
 
-        # Clean all tables between tests
+        # Clean all tables between tests; in memory this is a handful of
+        # page writes, no fsync
         for tbl in reversed(db.metadata.sorted_tables):
             db.session.execute(tbl.delete())
         db.session.commit()
@@ -92,13 +134,12 @@ def create_user(db_session):
     Used by many integration tests.
     """
 
-    from werkzeug.security import generate_password_hash
-    from app import User
+    from app import User, hash_password
 
     def _create(username="testuser", password="testpass"):
         user = User(
             username=username,
-            password_hash=generate_password_hash(password)
+            password_hash=hash_password(password)
         )
         db_session.add(user)
         db_session.commit()
@@ -121,3 +162,98 @@ def login_user(client):
         )
 
     return _login
+
+
+# Canned values for every helper the admin dashboard collects from
+ADMIN_METRIC_STUBS = {
+    "get_test_coverage": lambda: 90.0,
+    "get_test_results": lambda: {
+        "total": 10, "passed": 10, "failed": 0, "skipped": 0, "duration": 1,
+    },
+    "get_security_metrics": lambda now=None: {
+        "logins_24h": 1,
+        "logins_7d": 2,
+        "secret_key_secure": False,
+        "https_enforced": False,
+        "using_orm": True,
+        "xss_protected": True,
+    },
+    "get_security_score": lambda now=None: {
+        "score": 80, "max_score": 100, "percentage": 80.0, "grade": "B", "issues": [],
+    },
+    "get_critical_issues": lambda *args: [],
+    "get_action_items": lambda *args: [],
+    "get_system_health_summary": lambda *args: {
+        "overall_status": "healthy",
+        "overall_message": "All systems operational",
+        "health_score": 100.0,
+        "components": {},
+        "last_check": "now",
+    },
+    "get_ci_cd_status": lambda: {
+        "is_ci": False,
+        "github_actions": False,
+        "has_coverage": False,
+        "has_test_report": False,
+        "last_check": "now",
+    },
+    "get_performance_metrics": lambda now=None: {
+        "total_users": 1,
+        "total_games": 1,
+        "total_actions": 1,
+        "avg_games_per_user": 1.0,
+        "games_last_hour": 1,
+        "actions_last_hour": 1,
+        "activity_rate": 1.0,
+    },
+    "get_code_quality_metrics": lambda: {
+        "total_files": 1,
+        "total_lines": 10,
+        "test_lines": 5,
+        "code_to_test_ratio": 1.0,
+    },
+    "get_infrastructure_health": lambda: {
+        "database_status": "connected",
+        "database_type": "SQLite",
+        "python_version": "3.13.0",
+        "flask_version": "3.1.2",
+        "environment": "development",
+        "is_production": False,
+    },
+}
+
+
+@pytest.fixture
+def patched_admin_metrics():
+    """
+    Stub the admin dashboard's heavy helpers so the route is fast,
+    deterministic and never runs subprocesses. All stubs go on and come
+    off together as one patch.
+    """
+    with mock.patch.multiple("app", **ADMIN_METRIC_STUBS):
+        yield
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager that records every SQL statement executed inside it.
+    Lets tests fence routes against N+1 query regressions.
+    """
+
+    @contextmanager
+    def _count():
+        with app.app_context():
+            engine = db.engine
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+    return _count
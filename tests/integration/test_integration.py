@@ -1,9 +1,9 @@
 # tests/test_integration.py
 
-from datetime import datetime
+import time
 
 import pytest
-from werkzeug.security import generate_password_hash
+from sqlalchemy import func, insert, select
 
 from app import (
     app,
@@ -11,6 +11,7 @@ from app import (
     User,
     HandHistory,
     ActionLog,
+    hash_password,
     get_user_statistics,
 )
 
@@ -25,7 +26,7 @@ pytestmark = pytest.mark.integration
 
 
 def create_user(db_session, username="player1", password="secret"):
-    pw_hash = generate_password_hash(password)
+    pw_hash = hash_password(password)
     user = User(username=username, password_hash=pw_hash)
     db_session.add(user)
     db_session.commit()
@@ -33,10 +34,10 @@ def create_user(db_session, username="player1", password="secret"):
 
 
 def login_user(client, username, password):
+    # callers only need the session cookie, not the game page behind the redirect
     return client.post(
         "/login",
         data={"username": username, "password": password},
-        follow_redirects=True,
     )
 
 
@@ -57,9 +58,9 @@ def test_register_and_login_happy_path(client, db_session):
     resp = client.post(
         "/register",
         data={"username": "integ_user", "password": "supersecret"},
-        follow_redirects=True,
     )
-    assert resp.status_code == 200  # Should end on login page or similar
+    assert resp.status_code == 302
+    assert "/login" in resp.location
 
     # User should exist in DB
     user = User.query.filter_by(username="integ_user").first()
@@ -68,7 +69,7 @@ def test_register_and_login_happy_path(client, db_session):
 
     # Login with correct credentials
     resp = login_user(client, "integ_user", "supersecret")
-    assert resp.status_code == 200
+    assert resp.status_code == 302
 
     # Index should now be accessible
     resp = client.get("/", follow_redirects=True)
@@ -80,38 +81,30 @@ def test_register_and_login_happy_path(client, db_session):
     )
 
 
-def test_login_rejects_invalid_password(client, db_session):
+@pytest.mark.parametrize(
+    "username,password,seed_user",
+    [
+        ("loginuser", "wrongpass", True),  # existing user, wrong password
+        ("ghost", "whatever", False),  # user doesn't exist
+    ],
+)
+def test_login_rejects_bad_credentials(client, db_session, username, password, seed_user):
     """
-    Existing user with wrong password should not be logged in.
-    No login ActionLog should be recorded.
+    A failed login should not crash, sign the session in, or be logged.
     """
-    user = create_user(db_session, "loginuser", "correctpass")
+    if seed_user:
+        create_user(db_session, username, "correctpass")
 
     resp = client.post(
         "/login",
-        data={"username": "loginuser", "password": "wrongpass"},
+        data={"username": username, "password": password},
         follow_redirects=True,
     )
     assert resp.status_code == 200  # stays on login page
 
-    # No ActionLog for login
-    logs = ActionLog.query.filter_by(user_id=user.id, action="login").all()
-    assert len(logs) == 0
-
-
-def test_login_rejects_nonexistent_user(client, db_session):
-    """
-    Logging in with a user that doesn't exist should not crash or log.
-    """
-    resp = client.post(
-        "/login",
-        data={"username": "ghost", "password": "whatever"},
-        follow_redirects=True,
-    )
-    assert resp.status_code == 200  # login page again
-
-    # No user, so obviously no ActionLog for 'ghost'
-    assert User.query.filter_by(username="ghost").first() is None
+    with client.session_transaction() as sess:
+        assert sess.get("user") is None
+    assert ActionLog.query.filter_by(action="login").count() == 0
 
 
 # ---------------------------------------------------------
@@ -127,9 +120,9 @@ def test_user_dashboard_shows_for_logged_in_user(client, db_session):
     login_user(client, "dashuser", "pw")
 
     # Add some game history
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(HandHistory(user_id=user.id, result="loss"))
+    db_session.execute(insert(HandHistory), [
+        {"user_id": user.id, "result": result} for result in ("win", "win", "loss")
+    ])
     db_session.commit()
 
     # Hit dashboard
@@ -158,201 +151,23 @@ def test_user_cannot_access_admin_dashboard(client, db_session):
     assert resp.location.endswith("/") or "/?" in resp.location
 
 
-def test_admin_can_access_admin_dashboard(client, db_session, monkeypatch):
-    """
-    Admin user should see /admin/dashboard.
-    We monkeypatch heavy metrics so this stays fast and doesn't run subprocesses.
-    """
-    # Create default admin user (username == 'admin')
-    create_user(db_session, "admin", "adminpw")
-    login_user(client, "admin", "adminpw")
-
-    # Monkeypatch heavy helper functions to avoid subprocess calls
-    monkeypatch.setattr("app.get_test_coverage", lambda: 90.0)
-    monkeypatch.setattr(
-        "app.get_test_results",
-        lambda: {"total": 10, "passed": 10, "failed": 0, "skipped": 0, "duration": 1},
-    )
-    monkeypatch.setattr(
-        "app.get_security_metrics",
-        lambda: {
-            "logins_24h": 1,
-            "logins_7d": 2,
-            "secret_key_secure": False,
-            "https_enforced": False,
-            "using_orm": True,
-            "xss_protected": True,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_security_score",
-        lambda: {
-            "score": 80,
-            "max_score": 100,
-            "percentage": 80.0,
-            "grade": "B",
-            "issues": [],
-        },
-    )
-    monkeypatch.setattr("app.get_critical_issues", lambda: [])
-    monkeypatch.setattr("app.get_action_items", lambda: [])
-    monkeypatch.setattr(
-        "app.get_system_health_summary",
-        lambda: {
-            "overall_status": "healthy",
-            "overall_message": "All systems operational",
-            "health_score": 100.0,
-            "components": {},
-            "last_check": "now",
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_ci_cd_status",
-        lambda: {
-            "is_ci": False,
-            "github_actions": False,
-            "has_coverage": False,
-            "has_test_report": False,
-            "last_check": "now",
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_performance_metrics",
-        lambda: {
-            "total_users": 1,
-            "total_games": 1,
-            "total_actions": 1,
-            "avg_games_per_user": 1.0,
-            "games_last_hour": 1,
-            "actions_last_hour": 1,
-            "activity_rate": 1.0,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_code_quality_metrics",
-        lambda: {
-            "total_files": 1,
-            "total_lines": 10,
-            "test_lines": 5,
-            "code_to_test_ratio": 1.0,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_infrastructure_health",
-        lambda: {
-            "database_status": "connected",
-            "database_type": "SQLite",
-            "python_version": "3.13.0",
-            "flask_version": "3.1.2",
-            "environment": "development",
-            "is_production": False,
-        },
-    )
-
-    resp = client.get("/admin/dashboard", follow_redirects=True)
-    assert resp.status_code == 200
-    assert b"dashboard" in resp.data.lower() or b"devops" in resp.data.lower()
-
-
-def test_admin_login_with_default_credentials_can_access_admin_dashboard(client, db_session, monkeypatch):
+@pytest.mark.parametrize(
+    "password",
+    [
+        "adminpw",
+        # the default credentials production is seeded with
+        "Admin123",
+    ],
+)
+def test_admin_can_access_admin_dashboard(client, db_session, patched_admin_metrics, password):
     """
-    Admin should be able to log in with the default credentials
-    (username: admin, password: Admin123) and access /admin/dashboard.
-
-    This uses the same heavy-metric monkeypatching as the other admin test
-    so it stays fast and doesn't trigger subprocesses.
+    Admin user (username == 'admin') should see /admin/dashboard.
+    Heavy metrics are stubbed so this stays fast and doesn't run subprocesses.
     """
-    # Create admin user in the test DB with the same creds as production
-    create_user(db_session, "admin", "Admin123")
-
-    # Log in with the default admin credentials
-    login_user(client, "admin", "Admin123")
+    create_user(db_session, "admin", password)
+    login_user(client, "admin", password)
 
-    # Monkeypatch heavy helper functions to avoid subprocess calls / external deps
-    monkeypatch.setattr("app.get_test_coverage", lambda: 90.0)
-    monkeypatch.setattr(
-        "app.get_test_results",
-        lambda: {"total": 10, "passed": 10, "failed": 0, "skipped": 0, "duration": 1},
-    )
-    monkeypatch.setattr(
-        "app.get_security_metrics",
-        lambda: {
-            "logins_24h": 1,
-            "logins_7d": 2,
-            "secret_key_secure": False,
-            "https_enforced": False,
-            "using_orm": True,
-            "xss_protected": True,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_security_score",
-        lambda: {
-            "score": 80,
-            "max_score": 100,
-            "percentage": 80.0,
-            "grade": "B",
-            "issues": [],
-        },
-    )
-    monkeypatch.setattr("app.get_critical_issues", lambda: [])
-    monkeypatch.setattr("app.get_action_items", lambda: [])
-    monkeypatch.setattr(
-        "app.get_system_health_summary",
-        lambda: {
-            "overall_status": "healthy",
-            "overall_message": "All systems operational",
-            "health_score": 100.0,
-            "components": {},
-            "last_check": "now",
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_ci_cd_status",
-        lambda: {
-            "is_ci": False,
-            "github_actions": False,
-            "has_coverage": False,
-            "has_test_report": False,
-            "last_check": "now",
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_performance_metrics",
-        lambda: {
-            "total_users": 1,
-            "total_games": 1,
-            "total_actions": 1,
-            "avg_games_per_user": 1.0,
-            "games_last_hour": 1,
-            "actions_last_hour": 1,
-            "activity_rate": 1.0,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_code_quality_metrics",
-        lambda: {
-            "total_files": 1,
-            "total_lines": 10,
-            "test_lines": 5,
-            "code_to_test_ratio": 1.0,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_infrastructure_health",
-        lambda: {
-            "database_status": "connected",
-            "database_type": "SQLite",
-            "python_version": "3.13.0",
-            "flask_version": "3.1.2",
-            "environment": "development",
-            "is_production": False,
-        },
-    )
-
-    # Hit the admin dashboard
     resp = client.get("/admin/dashboard", follow_redirects=True)
-
     assert resp.status_code == 200
     # Page should look like an admin/devops dashboard
     assert b"dashboard" in resp.data.lower() or b"devops" in resp.data.lower()
@@ -363,7 +178,7 @@ def test_admin_login_with_default_credentials_can_access_admin_dashboard(client,
 # ---------------------------------------------------------
 
 
-def test_gameplay_flow_hit_stand_records_history(client, db_session):
+def test_gameplay_flow_hit_stand_records_history(client, db_session, count_queries):
     """
     Full gameplay flow:
     - Login as user
@@ -371,36 +186,46 @@ def test_gameplay_flow_hit_stand_records_history(client, db_session):
     - Hit once
     - Stand
     - Verify ActionLog and HandHistory records are present
+    - Keep the hit/stand requests to a bounded number of statements
     """
     user = create_user(db_session, "gamer", "pw")
     login_user(client, "gamer", "pw")
 
-    # Visiting index sets up game in memory
+    # Visiting index deals the first hand
     resp = client.get("/", follow_redirects=True)
     assert resp.status_code == 200
 
     # Perform a hit
-    resp = client.get("/hit", follow_redirects=True)
-    assert resp.status_code == 200
-
-    # There should be at least one 'hit' action logged
-    hit_logs = ActionLog.query.filter_by(user_id=user.id, action="hit").all()
-    assert len(hit_logs) >= 1
+    with count_queries() as hit_queries:
+        resp = client.get("/hit")
+    assert resp.status_code == 302
 
     # Now stand to finish the hand and record a game result
-    resp = client.get("/stand", follow_redirects=True)
-    assert resp.status_code == 200
-
-    # 'stand' should be logged
-    stand_logs = ActionLog.query.filter_by(user_id=user.id, action="stand").all()
-    assert len(stand_logs) >= 1
+    with count_queries() as stand_queries:
+        resp = client.get("/stand")
+    assert resp.status_code == 302
+    # a bust on /hit already finishes the hand, so the split between the
+    # two requests varies; their sum doesn't grow with history size. Each
+    # request spends two of them loading and saving the hand in game_state.
+    assert len(hit_queries) + len(stand_queries) <= 10
+
+    # both the 'hit' and the 'stand' should be logged
+    action_counts = dict(db.session.execute(
+        select(ActionLog.action, func.count())
+        .where(ActionLog.user_id == user.id)
+        .group_by(ActionLog.action)
+    ).all())
+    assert action_counts.get("hit", 0) >= 1
+    assert action_counts.get("stand", 0) >= 1
 
     # There should be at least one HandHistory record with a valid result.
     # In bust scenarios, there may be 2 (one from /hit, one from /stand).
-    hands = HandHistory.query.filter_by(user_id=user.id).all()
-    assert len(hands) >= 1
-    for h in hands:
-        assert h.result in ("win", "loss", "push")
+    results = db.session.scalars(
+        select(HandHistory.result).where(HandHistory.user_id == user.id)
+    ).all()
+    assert len(results) >= 1
+    for result in results:
+        assert result in ("win", "loss", "push")
 
 
 def test_new_game_starts_fresh_and_logs_action(client, db_session):
@@ -411,8 +236,8 @@ def test_new_game_starts_fresh_and_logs_action(client, db_session):
     login_user(client, "newgamer", "pw")
 
     # Call /new
-    resp = client.get("/new", follow_redirects=True)
-    assert resp.status_code == 200
+    resp = client.get("/new")
+    assert resp.status_code == 302
 
     logs = ActionLog.query.filter_by(user_id=user.id, action="new_game").all()
     assert len(logs) == 1
@@ -420,16 +245,19 @@ def test_new_game_starts_fresh_and_logs_action(client, db_session):
 
 def test_index_uses_session_timer(client, db_session, monkeypatch):
     """
-    Index should handle session_start in session and not crash when computing time.
+    Index should handle session_start_ts in session and not crash when computing time.
     This also indirectly tests format_seconds_hhmmss and session logic.
     """
-    create_user(db_session, "timeruser", "pw")
-    login_user(client, "timeruser", "pw")
+    user = create_user(db_session, "timeruser", "pw")
 
-    # Manually tweak session_start to a fixed past time
+    # Sign the session in directly (the login flow has its own tests), with
+    # session_start_ts an hour ago
     with client.session_transaction() as sess:
-        sess["session_start"] = datetime.utcnow().isoformat()
+        sess["user"] = user.username
+        sess["user_id"] = user.id
+        sess["session_start_ts"] = int(time.time()) - 3600
 
     resp = client.get("/", follow_redirects=True)
     assert resp.status_code == 200
-    # We don't assert exact timer string, but page should load fine with timer logic executed.
+    # seconds may tick over during the request, so only match up to the minute
+    assert b"01:00:0" in resp.data
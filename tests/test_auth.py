@@ -3,7 +3,21 @@
 from werkzeug.security import generate_password_hash
 from flask import session
 
-from app import app, db, User, ActionLog, is_admin
+from app import (
+    app,
+    db,
+    User,
+    ActionLog,
+    is_admin,
+    load_logged_in_user,
+    hash_password,
+    verify_password,
+    password_needs_rehash,
+)
+
+# pbkdf2 hash in the format older Werkzeug defaults produced; it doesn't depend
+# on the database, so it's built once for the tests that need a legacy hash
+LEGACY_SECRET_HASH = generate_password_hash("secret", method="pbkdf2:sha256:1000")
 
 
 def test_register_creates_user(client, db_session):
@@ -21,6 +35,7 @@ def test_register_creates_user(client, db_session):
     assert user is not None
     assert user.username == "alice"
     assert user.password_hash != "secret"  # should be hashed
+    assert user.password_hash.startswith("$argon2id$")
 
 
 def test_register_rejects_empty_fields(client, db_session):
@@ -38,7 +53,7 @@ def test_register_rejects_empty_fields(client, db_session):
 
 def test_register_rejects_duplicate_username(client, db_session):
     """Second registration with same username should fail."""
-    password_hash = generate_password_hash("secret")
+    password_hash = hash_password("secret")
     user = User(username="bob", password_hash=password_hash)
     db_session.add(user)
     db_session.commit()
@@ -56,7 +71,7 @@ def test_register_rejects_duplicate_username(client, db_session):
 
 def test_login_success_sets_session_and_logs_action(client, db_session):
     """Valid login should set session['user'] and log a login ActionLog."""
-    pw_hash = generate_password_hash("secret")
+    pw_hash = hash_password("secret")
     user = User(username="carol", password_hash=pw_hash)
     db_session.add(user)
     db_session.commit()
@@ -72,16 +87,46 @@ def test_login_success_sets_session_and_logs_action(client, db_session):
     # Check session
     with client.session_transaction() as sess:
         assert sess.get("user") == "carol"
-        assert "session_start" in sess
+        assert sess.get("user_id") == user.id
+        assert "session_start_ts" in sess
 
     # Check ActionLog entry
     login_logs = ActionLog.query.filter_by(user_id=user.id, action="login").all()
     assert len(login_logs) == 1
 
 
+def test_login_rehashes_legacy_password_hash(client, db_session):
+    """A pbkdf2 hash from an older Werkzeug default is upgraded to Argon2id on login."""
+    user = User(username="legacy", password_hash=LEGACY_SECRET_HASH)
+    db_session.add(user)
+    db_session.commit()
+
+    client.post(
+        "/login",
+        data={"username": "legacy", "password": "secret"},
+        follow_redirects=True,
+    )
+
+    db_session.refresh(user)
+    assert user.password_hash.startswith("$argon2id$")
+    assert not password_needs_rehash(user.password_hash)
+
+
+def test_verify_password_handles_argon2_and_legacy_hashes():
+    argon2_hash = hash_password("secret")
+    assert verify_password(argon2_hash, "secret")
+    assert not verify_password(argon2_hash, "wrong")
+    assert not password_needs_rehash(argon2_hash)
+
+    legacy = LEGACY_SECRET_HASH
+    assert verify_password(legacy, "secret")
+    assert not verify_password(legacy, "wrong")
+    assert password_needs_rehash(legacy)
+
+
 def test_login_failure_does_not_set_session(client, db_session):
     """Invalid login should not set session['user']."""
-    pw_hash = generate_password_hash("secret")
+    pw_hash = hash_password("secret")
     user = User(username="dave", password_hash=pw_hash)
     db_session.add(user)
     db_session.commit()
@@ -103,7 +148,7 @@ def test_login_failure_does_not_set_session(client, db_session):
 
 def test_logout_clears_session_and_logs_action(client, db_session):
     """GET /logout should clear session and log a logout ActionLog."""
-    pw_hash = generate_password_hash("secret")
+    pw_hash = hash_password("secret")
     user = User(username="erin", password_hash=pw_hash)
     db_session.add(user)
     db_session.commit()
@@ -121,12 +166,27 @@ def test_logout_clears_session_and_logs_action(client, db_session):
 
     with client.session_transaction() as sess:
         assert sess.get("user") is None
-        assert sess.get("session_start") is None
+        assert sess.get("user_id") is None
+        assert sess.get("session_start_ts") is None
 
     logout_logs = ActionLog.query.filter_by(user_id=user.id, action="logout").all()
     assert len(logout_logs) == 1
 
 
+def test_logged_in_user_is_loaded_once_per_request(db_session, count_queries):
+    """Repeated lookups within a request reuse the row kept on g."""
+    user = User(username="gina", password_hash=hash_password("secret"))
+    db_session.add(user)
+    db_session.commit()
+
+    with app.test_request_context():
+        session["user"] = "gina"
+        with count_queries() as queries:
+            assert load_logged_in_user().username == "gina"
+            assert load_logged_in_user().username == "gina"
+        assert len(queries) == 1
+
+
 def test_index_requires_login(client):
     """The index route is protected by login_required."""
     resp = client.get("/", follow_redirects=False)
@@ -143,7 +203,7 @@ def test_admin_dashboard_requires_login(client):
 
 def test_admin_dashboard_rejects_non_admin(client, db_session):
     """Logged-in non-admin user should be redirected away from admin dashboard."""
-    pw_hash = generate_password_hash("userpass")
+    pw_hash = hash_password("userpass")
     user = User(username="normaluser", password_hash=pw_hash)
     db_session.add(user)
     db_session.commit()
@@ -161,8 +221,8 @@ def test_admin_dashboard_rejects_non_admin(client, db_session):
 
 
 def test_is_admin_true_for_admin_user(db_session, monkeypatch):
-    """is_admin returns True for 'admin' or users listed in ADMIN_USERS env."""
-    pw_hash = generate_password_hash("adminpass")
+    """is_admin returns True for 'admin' or users listed in ADMIN_USERS."""
+    pw_hash = hash_password("adminpass")
     admin = User(username="admin", password_hash=pw_hash)
     db_session.add(admin)
     db_session.commit()
@@ -170,8 +230,8 @@ def test_is_admin_true_for_admin_user(db_session, monkeypatch):
     # Default behavior: username == 'admin'
     assert is_admin(admin) is True
 
-    # Test ADMIN_USERS env override
-    monkeypatch.setenv("ADMIN_USERS", "alice,bob")
+    # ADMIN_USERS is parsed from the environment at import time
+    monkeypatch.setattr("app.ADMIN_USERS", frozenset({"admin", "alice", "bob"}))
     other_admin = User(username="alice", password_hash=pw_hash)
     assert is_admin(other_admin) is True
 
@@ -179,28 +239,11 @@ def test_is_admin_true_for_admin_user(db_session, monkeypatch):
     assert is_admin(non_admin) is False
     assert is_admin(None) is False
 
-from werkzeug.security import generate_password_hash
-from app import (
-    app,
-    User,
-    get_test_coverage,
-    get_test_results,
-    get_security_metrics,
-    get_security_score,
-    get_critical_issues,
-    get_action_items,
-    get_system_health_summary,
-    get_ci_cd_status,
-    get_performance_metrics,
-    get_code_quality_metrics,
-    get_infrastructure_health,
-)
-
 
-def test_admin_dashboard_renders_for_admin_user(client, db_session, monkeypatch):
+def test_admin_dashboard_renders_for_admin_user(client, db_session, patched_admin_metrics):
     """Admin user should see /admin/dashboard without heavy subprocess work."""
     # Create admin user
-    pw_hash = generate_password_hash("adminpass")
+    pw_hash = hash_password("adminpass")
     admin_user = User(username="admin", password_hash=pw_hash)
     db_session.add(admin_user)
     db_session.commit()
@@ -212,72 +255,6 @@ def test_admin_dashboard_renders_for_admin_user(client, db_session, monkeypatch)
         follow_redirects=True,
     )
 
-    # Monkeypatch all heavy helpers so route is fast & deterministic
-    monkeypatch.setattr("app.get_test_coverage", lambda: 85.0)
-    monkeypatch.setattr(
-        "app.get_test_results",
-        lambda: {"total": 10, "passed": 10, "failed": 0, "skipped": 0, "duration": 1},
-    )
-    monkeypatch.setattr("app.get_security_metrics", lambda: {"logins_24h": 1, "logins_7d": 2, "secret_key_secure": False, "https_enforced": False, "using_orm": True, "xss_protected": True})
-    monkeypatch.setattr(
-        "app.get_security_score",
-        lambda: {"score": 80, "max_score": 100, "percentage": 80.0, "grade": "B", "issues": []},
-    )
-    monkeypatch.setattr("app.get_critical_issues", lambda: [])
-    monkeypatch.setattr("app.get_action_items", lambda: [])
-    monkeypatch.setattr(
-        "app.get_system_health_summary",
-        lambda: {
-            "overall_status": "healthy",
-            "overall_message": "All systems operational",
-            "health_score": 100.0,
-            "components": {},
-            "last_check": "now",
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_ci_cd_status",
-        lambda: {
-            "is_ci": False,
-            "github_actions": False,
-            "has_coverage": False,
-            "has_test_report": False,
-            "last_check": "now",
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_performance_metrics",
-        lambda: {
-            "total_users": 1,
-            "total_games": 1,
-            "total_actions": 1,
-            "avg_games_per_user": 1.0,
-            "games_last_hour": 1,
-            "actions_last_hour": 1,
-            "activity_rate": 1.0,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_code_quality_metrics",
-        lambda: {
-            "total_files": 1,
-            "total_lines": 10,
-            "test_lines": 5,
-            "code_to_test_ratio": 1.0,
-        },
-    )
-    monkeypatch.setattr(
-        "app.get_infrastructure_health",
-        lambda: {
-            "database_status": "connected",
-            "database_type": "SQLite",
-            "python_version": "3.13.0",
-            "flask_version": "3.1.2",
-            "environment": "development",
-            "is_production": False,
-        },
-    )
-
     resp = client.get("/admin/dashboard", follow_redirects=True)
     assert resp.status_code == 200
     # sanity check we rendered something that looks like a dashboard
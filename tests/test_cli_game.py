@@ -0,0 +1,61 @@
+# tests/test_cli_game.py
+
+import pytest
+
+from blackjack.game import DECK, add_card, calculate_hand_value, create_deck
+
+
+def test_create_deck_has_52_unique_cards():
+    deck = create_deck()
+    assert len(deck) == 52
+    assert {(card['rank'], card['suit']) for card in deck} == {
+        (card['rank'], card['suit']) for card in DECK
+    }
+
+
+def test_shared_cards_cannot_be_mutated():
+    # every deck hands out the same DECK objects, so they must be read-only
+    card = create_deck()[0]
+    assert any(card is shared for shared in DECK)
+    with pytest.raises(TypeError):
+        card['rank'] = 'X'
+
+
+def card(rank):
+    return {'rank': rank, 'suit': 'Spades'}
+
+
+def test_add_card_keeps_a_soft_ace_at_11():
+    value, aces = add_card(0, 0, card('A'))
+    value, aces = add_card(value, aces, card('6'))
+    assert (value, aces) == (17, 1)
+
+
+def test_add_card_demotes_ace_when_hand_would_bust():
+    # soft 17 + 10 -> hard 17
+    value, aces = add_card(17, 1, card('K'))
+    assert (value, aces) == (17, 0)
+
+
+def test_add_card_demotes_one_ace_at_a_time():
+    value, aces = 0, 0
+    for rank in ('A', 'A'):
+        value, aces = add_card(value, aces, card(rank))
+    # A + A = 12 with one ace still soft
+    assert (value, aces) == (12, 1)
+
+    value, aces = add_card(value, aces, card('9'))
+    assert (value, aces) == (21, 1)
+    value, aces = add_card(value, aces, card('K'))
+    assert (value, aces) == (21, 0)
+    # no soft ace left to demote, so the hand busts
+    assert add_card(value, aces, card('5')) == (26, 0)
+
+
+def test_calculate_hand_value_matches_running_total():
+    hand = [card(rank) for rank in ('A', '5', 'A', '9', '3')]
+    value, aces = 0, 0
+    for size, c in enumerate(hand, start=1):
+        value, aces = add_card(value, aces, c)
+        assert calculate_hand_value(hand[:size]) == value
+    assert value == 19
@@ -1,15 +1,25 @@
 # tests/test_dashboard.py
 # test
 
+import os
+import time
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import InvalidRequestError, OperationalError
 
 from app import (
     app,
+    db,
+    cache,
+    DailyStats,
     User,
     HandHistory,
     ActionLog,
+    hash_password,
     get_user_statistics,
+    record_hand_result,
     get_recent_games,
     get_user_game_history,
     get_system_overview,
@@ -19,6 +29,9 @@ from app import (
     get_hourly_activity,
     get_system_health,
     get_security_metrics,
+    get_test_coverage,
+    get_test_results,
+    get_testing_summary,
     get_security_score,
     get_performance_metrics,
     get_code_quality_metrics,
@@ -27,6 +40,8 @@ from app import (
     get_critical_issues,
     get_action_items,
     get_system_health_summary,
+    dashboard_now,
+    database_is_reachable,
     is_admin,
 )
 
@@ -35,21 +50,41 @@ from app import (
 # Helpers
 # -------------------------------------------------------------------
 
-def create_and_login_user(client, db_session, username="dashboarduser", password="pass123"):
-    """Helper to create user and log them in via /login."""
-    pw_hash = generate_password_hash(password)
+def create_user(db_session, username="dashboarduser", password="pass123",
+                history=(), actions=()):
+    """Helper to create a user for tests that call dashboard helpers directly.
+    `history` results and `actions` are seeded for the user in the same commit."""
+    pw_hash = hash_password(password)
     user = User(username=username, password_hash=pw_hash)
     db_session.add(user)
+    if history or actions:
+        db_session.flush()  # assigns user.id for the child rows
+        db_session.add_all([HandHistory(user_id=user.id, result=r) for r in history])
+        db_session.add_all([ActionLog(user_id=user.id, action=a) for a in actions])
     db_session.commit()
+    return user
 
-    client.post(
-        "/login",
-        data={"username": username, "password": password},
-        follow_redirects=True,
-    )
+
+def create_and_login_user(client, db_session, username="dashboarduser", password="pass123",
+                          history=(), actions=()):
+    """Helper to create a user and sign the test client in as them. The
+    session is written directly, along with the 'login' action the route
+    would have logged; test_dashboard_after_login_through_the_route keeps
+    these keys honest against the real /login."""
+    user = create_user(db_session, username, password, history, [*actions, "login"])
+    with client.session_transaction() as sess:
+        sess["user"] = user.username
+        sess["user_id"] = user.id
+        sess["session_start_ts"] = int(time.time())
     return user
 
 
+def bulk_add(db_session, model, rows):
+    """Insert `rows` (dicts of column values) in one executemany and commit."""
+    db_session.execute(insert(model), rows)
+    db_session.commit()
+
+
 # -------------------------------------------------------------------
 # Route-level tests (user dashboard)
 # -------------------------------------------------------------------
@@ -63,11 +98,8 @@ def test_dashboard_requires_login(client):
 
 def test_dashboard_displays_for_logged_in_user(client, db_session):
     """Dashboard should render successfully for a logged-in user."""
-    user = create_and_login_user(client, db_session)
-
     # Add a little history so the template has something to show
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.commit()
+    create_and_login_user(client, db_session, history=["win"])
 
     response = client.get("/dashboard", follow_redirects=True)
     assert response.status_code == 200
@@ -75,6 +107,153 @@ def test_dashboard_displays_for_logged_in_user(client, db_session):
     assert b"dashboard" in response.data.lower() or b"game" in response.data.lower()
 
 
+def test_dashboard_after_login_through_the_route(client, db_session):
+    """End to end through POST /login, so the dashboard is exercised with the
+    session the route really writes rather than the one the helper forges."""
+    user_id = create_user(db_session, history=["win", "loss"]).id
+
+    response = client.post("/login", data={"username": "dashboarduser", "password": "pass123"})
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        # the keys create_and_login_user writes in place of a real login
+        assert sess["user"] == "dashboarduser"
+        assert sess["user_id"] == user_id
+        assert sess["session_start_ts"] <= int(time.time())
+    assert ActionLog.query.filter_by(user_id=user_id, action="login").count() == 1
+
+    response = client.get("/dashboard")
+    assert response.status_code == 200
+    assert b"50.0%" in response.data
+
+
+def test_dashboard_query_count_is_bounded(client, db_session, count_queries):
+    """Dashboard cost must not grow with the number of games played."""
+    user = create_and_login_user(client, db_session)
+    for result in ("win", "loss", "push", "win"):
+        record_hand_result(user.id, result)
+    db_session.commit()
+
+    with count_queries() as queries:
+        response = client.get("/dashboard")
+    assert response.status_code == 200
+    assert len(queries) <= 4
+
+
+def test_result_count_uses_covering_index(db_session):
+    """Per-user result counts are answered from ix_hh_user_result alone."""
+    plan = db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT count(*) FROM hand_history "
+        "WHERE user_id = 1 AND result = 'win'"
+    )).all()
+    detail = " ".join(row[-1] for row in plan)
+    assert "COVERING INDEX ix_hh_user_result" in detail
+
+
+def test_recent_games_use_user_created_index(db_session):
+    """Per-user time-ordered reads seek ix_hh_user_created instead of sorting."""
+    plan = db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM hand_history "
+        "WHERE user_id = 1 ORDER BY created_at DESC LIMIT 10"
+    )).all()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_hh_user_created" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_login_windows_use_action_created_index(db_session):
+    """Login counts over a time window seek ix_actionlog_action_created."""
+    plan = db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT count(*) FROM action_log "
+        "WHERE action = 'login' AND created_at >= '2024-01-01'"
+    )).all()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_actionlog_action_created" in detail
+
+
+def test_upgrade_db_creates_missing_indexes(db_session):
+    """`flask upgrade-db` adds indexes an existing database predates."""
+    db_session.execute(text("DROP INDEX ix_hh_created"))
+    db_session.commit()
+
+    result = app.test_cli_runner().invoke(args=["upgrade-db"])
+    assert result.exit_code == 0, result.output
+
+    indexes = db_session.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )).scalars().all()
+    assert "ix_hh_created" in indexes
+
+
+def test_user_relationships_never_lazy_load(db_session):
+    """Related rows must be loaded explicitly, not through attribute access."""
+    user = User(username="lazyuser", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    db_session.expire(user, ["hands"])
+
+    with pytest.raises(InvalidRequestError):
+        user.hands
+
+
+def test_admin_dashboard_panels_load_on_worker_threads(client, db_session):
+    """Unpatched helpers run on the dashboard pool with their own sessions."""
+    create_and_login_user(client, db_session, username="admin", password="adminpass",
+                          history=["win"])
+
+    response = client.get("/admin/dashboard")
+    assert response.status_code == 200
+    assert b"Error loading dashboard" not in response.data
+
+
+def test_admin_dashboard_collects_each_report_once(client, db_session, monkeypatch):
+    """Issues, action items and the health summary reuse the panel values."""
+    create_and_login_user(client, db_session, username="admin", password="adminpass")
+    calls = []
+    monkeypatch.setattr("app.get_test_coverage", lambda: calls.append("coverage") or 60.0)
+    monkeypatch.setattr("app.get_test_results", lambda: calls.append("results") or None)
+
+    response = client.get("/admin/dashboard")
+    assert response.status_code == 200
+    assert sorted(calls) == ["coverage", "results"]
+    # the low coverage reached the issues list without another lookup
+    assert b"Test Coverage Below 75%" in response.data
+
+
+def test_admin_dashboard_shows_fallback_for_slow_panel(client, db_session, monkeypatch):
+    create_and_login_user(client, db_session, username="admin", password="adminpass")
+    monkeypatch.setattr("app.DASHBOARD_PANEL_TIMEOUT", 0.2)
+    monkeypatch.setattr("app.get_ci_cd_status", lambda: time.sleep(1) or {"is_ci": True})
+
+    started = time.monotonic()
+    response = client.get("/admin/dashboard")
+    assert response.status_code == 200
+    assert time.monotonic() - started < 1
+    assert b"Error loading dashboard" not in response.data
+
+
+def test_admin_dashboard_answers_304_when_unchanged(client, db_session, monkeypatch):
+    create_and_login_user(client, db_session, username="admin", password="adminpass")
+    rendered = []
+    monkeypatch.setattr("app.render_template", lambda *a, **k: rendered.append(a) or "page")
+
+    first = client.get("/admin/dashboard")
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+
+    again = client.get("/admin/dashboard", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert len(rendered) == 1
+
+    # new data changes the ETag, so the page is rendered again
+    db_session.add(HandHistory(user_id=User.query.first().id, result="win"))
+    db_session.commit()
+    cache.clear()
+    changed = client.get("/admin/dashboard", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert len(rendered) == 2
+
+
 def test_dashboard_handles_missing_user_gracefully(client, db_session):
     """If the session user is deleted, dashboard should not 500."""
     user = create_and_login_user(client, db_session)
@@ -91,15 +270,19 @@ def test_dashboard_handles_missing_user_gracefully(client, db_session):
 # Gameplay stats helper tests
 # -------------------------------------------------------------------
 
-def test_get_user_statistics_with_games(client, db_session):
-    user = create_and_login_user(client, db_session)
+def test_get_user_statistics_with_games(db_session, count_queries):
+    user_id = create_user(db_session).id
 
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(HandHistory(user_id=user.id, result="loss"))
-    db_session.commit()
+    bulk_add(db_session, HandHistory, [
+        {"user_id": user_id, "result": result} for result in ("win", "win", "loss")
+    ])
 
-    stats = get_user_statistics(user.id)
+    # no user_stats row yet: one miss, then one grouped aggregate rather
+    # than a count per result
+    with count_queries() as queries:
+        stats = get_user_statistics(user_id)
+    assert len(queries) == 2
+    assert "group by" in queries[1].lower()
 
     assert stats["total_games"] == 3
     assert stats["wins"] == 2
@@ -108,8 +291,8 @@ def test_get_user_statistics_with_games(client, db_session):
     assert stats["win_rate"] > 0
 
 
-def test_get_user_statistics_no_games(client, db_session):
-    user = create_and_login_user(client, db_session)
+def test_get_user_statistics_no_games(db_session):
+    user = create_user(db_session)
 
     stats = get_user_statistics(user.id)
 
@@ -120,24 +303,55 @@ def test_get_user_statistics_no_games(client, db_session):
     assert stats["win_rate"] == 0
 
 
-def test_get_recent_games_limit(client, db_session):
+def test_user_statistics_refresh_after_recorded_hand(client, db_session):
     user = create_and_login_user(client, db_session)
+    assert get_user_statistics(user.id)["total_games"] == 0
 
-    for _ in range(5):
-        db_session.add(HandHistory(user_id=user.id, result="win"))
+    # Standing always finishes the hand, and the route drops this
+    # user's memoized statistics after committing it
+    client.get("/stand")
+    assert get_user_statistics(user.id)["total_games"] == 1
+
+
+def test_get_user_statistics_reads_user_stats_row(db_session, count_queries):
+    user_id = create_user(db_session).id
+    for result in ("win", "win", "loss", "push"):
+        record_hand_result(user_id, result)
     db_session.commit()
 
+    with count_queries() as queries:
+        stats = get_user_statistics(user_id)
+    assert len(queries) == 1
+    assert stats == {
+        "total_games": 4, "wins": 2, "losses": 1, "pushes": 1, "win_rate": 50.0,
+    }
+
+
+def test_get_recent_games_limit(db_session):
+    user = create_user(db_session)
+
+    bulk_add(db_session, HandHistory, [{"user_id": user.id, "result": "win"}] * 5)
+
     recent = get_recent_games(user.id, limit=3)
     assert len(recent) <= 3
     assert len(recent) > 0
 
 
-def test_get_user_game_history_returns_days(client, db_session):
-    user = create_and_login_user(client, db_session)
-
+def test_get_recent_games_newest_first(db_session):
+    user = create_user(db_session)
+    db_session.add(HandHistory(user_id=user.id, result="loss",
+                               created_at=datetime.utcnow() - timedelta(hours=1)))
     db_session.add(HandHistory(user_id=user.id, result="win"))
     db_session.commit()
 
+    recent = get_recent_games(user.id)
+    assert [game.result for game in recent] == ["win", "loss"]
+    assert recent[0].created_at > recent[1].created_at
+
+
+def test_get_user_game_history_returns_days(db_session):
+    user = create_user(db_session, history=["win"])
+
     history = get_user_game_history(user.id, days=7)
     assert isinstance(history, list)
     assert len(history) > 0
@@ -145,15 +359,30 @@ def test_get_user_game_history_returns_days(client, db_session):
     assert "games" in history[0]
 
 
+def test_get_user_game_history_buckets_own_games_by_day(db_session):
+    user = create_user(db_session)
+    other = User(username="someoneelse", password_hash="x")
+    db_session.add(other)
+    db_session.commit()
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.add(HandHistory(user_id=user.id, result="loss", created_at=yesterday))
+    db_session.add(HandHistory(user_id=user.id, result="push", created_at=yesterday))
+    db_session.add(HandHistory(user_id=other.id, result="win"))
+    db_session.commit()
+
+    by_date = {day["date"]: day["games"] for day in get_user_game_history(user.id, days=7)}
+    assert by_date[datetime.utcnow().date()] == 1
+    assert by_date[yesterday.date()] == 2
+    assert sum(by_date.values()) == 3
+
+
 # -------------------------------------------------------------------
 # System / activity metrics
 # -------------------------------------------------------------------
 
 def test_get_system_overview_basic(client, db_session):
-    user = create_and_login_user(client, db_session)
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(ActionLog(user_id=user.id, action="login"))
-    db_session.commit()
+    create_and_login_user(client, db_session, history=["win"], actions=["login"])
 
     overview = get_system_overview()
     assert "total_users" in overview
@@ -164,11 +393,48 @@ def test_get_system_overview_basic(client, db_session):
     assert overview["total_actions"] >= 1
 
 
-def test_get_daily_activity(client, db_session):
+def test_get_system_overview_counts_time_windows(client, db_session):
     user = create_and_login_user(client, db_session)
+    old = datetime.utcnow() - timedelta(days=10)
     db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.add(HandHistory(user_id=user.id, result="loss", created_at=old))
+    db_session.add(ActionLog(user_id=user.id, action="login", created_at=old))
+    db_session.add(ActionLog(user_id=user.id, action="hit"))
     db_session.commit()
 
+    overview = get_system_overview()
+    assert overview["total_games"] == 2
+    assert overview["games_24h"] == 1
+    assert overview["games_7d"] == 1
+    assert overview["games_30d"] == 2
+    # one login from create_and_login_user plus the old one
+    assert overview["logins_7d"] == 1
+    assert overview["active_users_24h"] == 1
+    assert overview["total_actions"] == 3
+    assert overview["new_users_30d"] == 1
+
+
+def test_get_system_overview_counts_distinct_active_users(client, db_session, count_queries):
+    user = create_and_login_user(client, db_session)
+    other = User(username="otherplayer", password_hash="x")
+    db_session.add(other)
+    db_session.commit()
+    bulk_add(db_session, ActionLog, [
+        {"user_id": user_id, "action": "login"} for user_id in (user.id, user.id, user.id, other.id)
+    ])
+
+    with count_queries() as queries:
+        overview = get_system_overview()
+    assert overview["active_users_24h"] == 2
+    # deduplicated by the database, not by loading login rows, in the same
+    # statement as the per-table counts
+    assert len(queries) == 1
+    assert "distinct" in queries[0].lower()
+
+
+def test_get_daily_activity(client, db_session):
+    create_and_login_user(client, db_session, history=["win"])
+
     activity = get_daily_activity(days=3)
     assert isinstance(activity, list)
     assert len(activity) > 0
@@ -178,23 +444,99 @@ def test_get_daily_activity(client, db_session):
     assert "new_users" in activity[0]
 
 
-def test_get_action_distribution(client, db_session):
+def test_get_daily_activity_buckets_by_day(client, db_session):
     user = create_and_login_user(client, db_session)
-    db_session.add(ActionLog(user_id=user.id, action="login"))
-    db_session.add(ActionLog(user_id=user.id, action="hit"))
-    db_session.add(ActionLog(user_id=user.id, action="stand"))
+    two_days_ago = datetime.utcnow() - timedelta(days=2)
+    db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.add(HandHistory(user_id=user.id, result="loss", created_at=two_days_ago))
+    db_session.commit()
+
+    by_date = {day["date"]: day for day in get_daily_activity(days=3)}
+    today = by_date[datetime.utcnow().date()]
+    assert today["games"] == 2
+    assert today["logins"] == 1
+    assert today["new_users"] == 1
+    assert by_date[two_days_ago.date()]["games"] == 1
+
+
+def test_get_daily_activity_reads_rollup_without_writing(client, db_session):
+    user = create_and_login_user(client, db_session)
+    two_days_ago = datetime.utcnow() - timedelta(days=2)
+    db_session.add(HandHistory(user_id=user.id, result="win", created_at=two_days_ago))
+    db_session.commit()
+
+    # Days the rollup job hasn't stored yet are counted live, not written
+    by_date = {day["date"]: day for day in get_daily_activity(days=3)}
+    assert by_date[two_days_ago.date()]["games"] == 1
+    assert DailyStats.query.count() == 0
+
+    result = app.test_cli_runner().invoke(args=["rollup-daily-stats", "--days", "3"])
+    assert result.exit_code == 0, result.output
+    # one stored row per finished day in the window; today is not stored
+    assert DailyStats.query.count() == 3
+    assert db_session.get(DailyStats, datetime.utcnow().date()) is None
+
+    # Closed days are served from the rollup, today is still counted live
+    db_session.add(HandHistory(user_id=user.id, result="win", created_at=two_days_ago))
+    db_session.add(HandHistory(user_id=user.id, result="loss"))
     db_session.commit()
+    cache.delete_memoized(get_daily_activity)
+
+    by_date = {day["date"]: day for day in get_daily_activity(days=3)}
+    assert by_date[two_days_ago.date()]["games"] == 1
+    assert by_date[datetime.utcnow().date()]["games"] == 1
+
+    # the next run rewrites the day, so the late hand is counted
+    app.test_cli_runner().invoke(args=["rollup-daily-stats", "--days", "3"])
+    cache.delete_memoized(get_daily_activity)
+    by_date = {day["date"]: day for day in get_daily_activity(days=3)}
+    assert by_date[two_days_ago.date()]["games"] == 2
+    assert DailyStats.query.count() == 3
+
+
+def test_get_daily_activity_uses_passed_now(client, db_session):
+    create_and_login_user(client, db_session, history=["win"])
+
+    now = dashboard_now()
+    assert now.second == 0 and now.microsecond == 0
+
+    # A window that ended a week ago can't see today's game
+    week_ago = now - timedelta(days=7)
+    activity = get_daily_activity(days=3, now=week_ago)
+    assert activity[-1]["date"] == week_ago.date()
+    assert sum(day["games"] for day in activity) == 0
+
+
+def test_get_action_distribution(client, db_session):
+    user = create_and_login_user(client, db_session)
+    bulk_add(db_session, ActionLog, [
+        {"user_id": user.id, "action": action} for action in ("login", "hit", "stand")
+    ])
 
     dist = get_action_distribution()
     assert isinstance(dist, dict)
     assert any(action in dist for action in ("login", "hit", "stand"))
 
 
+def test_action_distribution_cached_across_game_writes(client, db_session):
+    user = create_and_login_user(client, db_session)
+    assert get_action_distribution() == {"login": 1}
+
+    # Writes, through the routes or not, don't drop the memoized value
+    db_session.add(ActionLog(user_id=user.id, action="hit"))
+    db_session.commit()
+    client.get("/new")
+    assert get_action_distribution() == {"login": 1}
+
+    # it catches up once its timeout expires
+    cache.delete_memoized(get_action_distribution)
+    assert get_action_distribution() == {"login": 1, "hit": 1, "new_game": 1}
+
+
 def test_get_most_active_users(client, db_session):
     user = create_and_login_user(client, db_session, username="activeuser")
-    for _ in range(3):
-        db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.commit()
+    bulk_add(db_session, HandHistory, [{"user_id": user.id, "result": "win"}] * 3)
 
     active = get_most_active_users(limit=5)
     assert isinstance(active, list)
@@ -202,11 +544,23 @@ def test_get_most_active_users(client, db_session):
     assert any(u["username"] == "activeuser" for u in active)
 
 
+def test_get_most_active_users_orders_by_game_count(db_session, count_queries):
+    casual = create_user(db_session, username="casual")
+    regular = create_user(db_session, username="regular")
+    bulk_add(db_session, HandHistory, [{"user_id": casual.id, "result": "loss"}]
+             + [{"user_id": regular.id, "result": "win"}] * 3)
+
+    # counted, ranked and limited in SQL: one statement however many users
+    with count_queries() as queries:
+        active = get_most_active_users(limit=1)
+    assert len(queries) == 1
+    assert active == [
+        {"username": "regular", "game_count": 3, "user_id": regular.id}
+    ]
+
+
 def test_get_hourly_activity(client, db_session):
-    user = create_and_login_user(client, db_session)
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(ActionLog(user_id=user.id, action="login"))
-    db_session.commit()
+    create_and_login_user(client, db_session, history=["win"], actions=["login"])
 
     hourly = get_hourly_activity()
     assert isinstance(hourly, list)
@@ -216,11 +570,23 @@ def test_get_hourly_activity(client, db_session):
     assert "logins" in hourly[0]
 
 
-def test_get_system_health(client, db_session):
+def test_get_hourly_activity_buckets_by_hour(client, db_session, count_queries):
     user = create_and_login_user(client, db_session)
-    db_session.add(HandHistory(user_id=user.id, result="win"))
+    played_at = (datetime.utcnow() - timedelta(days=1)).replace(hour=5)
+    db_session.add(HandHistory(user_id=user.id, result="win", created_at=played_at))
     db_session.commit()
 
+    with count_queries() as queries:
+        hourly = get_hourly_activity()
+    # games and logins come back together, not one query per series or hour
+    assert len(queries) == 1
+    assert hourly[5]["games"] == 1
+    assert sum(hour["logins"] for hour in hourly) == 1
+
+
+def test_get_system_health(client, db_session):
+    create_and_login_user(client, db_session, history=["win"])
+
     health = get_system_health()
     assert "database_status" in health
     assert "total_records" in health
@@ -229,19 +595,63 @@ def test_get_system_health(client, db_session):
     assert health["database_status"] in ("connected", "disconnected")
 
 
+def test_database_probe_is_reused_within_ttl(db_session, count_queries):
+    with count_queries() as queries:
+        assert database_is_reachable() is True
+        assert database_is_reachable() is True
+    assert queries == ["SELECT 1"]
+
+
+def test_failed_database_probe_leaves_session_usable(client, db_session, monkeypatch):
+    user = create_and_login_user(client, db_session)
+
+    def unreachable():
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(db.engine, "connect", unreachable)
+    assert database_is_reachable() is False
+    # the probe never touched the request session, so no rollback is needed
+    assert db_session.get(User, user.id).username == user.username
+
+
+def test_get_system_health_is_memoized(client, db_session, count_queries):
+    create_and_login_user(client, db_session)
+    get_system_health()
+    with count_queries() as queries:
+        get_system_health()
+    assert queries == []
+
+
+def test_get_system_health_status_is_not_memoized(client, db_session, monkeypatch):
+    create_and_login_user(client, db_session)
+    assert get_system_health()["database_status"] == "connected"
+
+    # the counts stay memoized, but the status follows the probe
+    monkeypatch.setattr("app.database_is_reachable", lambda: False)
+    assert get_system_health()["database_status"] == "disconnected"
+
+
+def test_get_system_health_counts_in_one_query(client, db_session, count_queries):
+    create_and_login_user(client, db_session, history=["win", "loss"])
+
+    with count_queries() as queries:
+        health = get_system_health()
+    # SELECT 1 probe + one combined count
+    assert len(queries) == 2
+    assert health["database_status"] == "connected"
+    assert health["total_records"] == {"users": 1, "games": 2, "actions": 1}
+    assert health["avg_games_per_user"] == 2.0
+    assert health["overall_win_rate"] == 50.0
+
+
 # -------------------------------------------------------------------
 # Security / DevSecOps metrics
 # -------------------------------------------------------------------
 
-def test_is_admin_function(db_session):
-    admin_pw = generate_password_hash("adminpass")
-    user_pw = generate_password_hash("userpass")
-
-    admin_user = User(username="admin", password_hash=admin_pw)
-    regular_user = User(username="bob", password_hash=user_pw)
-    db_session.add(admin_user)
-    db_session.add(regular_user)
-    db_session.commit()
+def test_is_admin_function():
+    # is_admin only looks at the username, so unsaved users are enough
+    admin_user = User(username="admin", password_hash="x")
+    regular_user = User(username="bob", password_hash="x")
 
     assert is_admin(admin_user) is True
     assert is_admin(regular_user) is False
@@ -249,10 +659,7 @@ def test_is_admin_function(db_session):
 
 
 def test_get_security_metrics(client, db_session):
-    user = create_and_login_user(client, db_session)
-    db_session.add(ActionLog(user_id=user.id, action="login"))
-    db_session.add(ActionLog(user_id=user.id, action="login"))
-    db_session.commit()
+    create_and_login_user(client, db_session, actions=["login", "login"])
 
     metrics = get_security_metrics()
     assert isinstance(metrics, dict)
@@ -262,11 +669,21 @@ def test_get_security_metrics(client, db_session):
     assert "https_enforced" in metrics
 
 
-def test_get_security_score(client, db_session):
+def test_get_security_metrics_counts_login_windows(client, db_session):
     user = create_and_login_user(client, db_session)
-    db_session.add(ActionLog(user_id=user.id, action="login"))
+    three_days_ago = datetime.utcnow() - timedelta(days=3)
+    db_session.add(ActionLog(user_id=user.id, action="login", created_at=three_days_ago))
+    db_session.add(ActionLog(user_id=user.id, action="hit"))
     db_session.commit()
 
+    metrics = get_security_metrics()
+    assert metrics["logins_24h"] == 1
+    assert metrics["logins_7d"] == 2
+
+
+def test_get_security_score(client, db_session):
+    create_and_login_user(client, db_session, actions=["login"])
+
     score = get_security_score()
     assert isinstance(score, dict)
     assert "score" in score
@@ -277,10 +694,7 @@ def test_get_security_score(client, db_session):
 
 
 def test_get_performance_metrics(client, db_session):
-    user = create_and_login_user(client, db_session)
-    db_session.add(HandHistory(user_id=user.id, result="win"))
-    db_session.add(ActionLog(user_id=user.id, action="hit"))
-    db_session.commit()
+    create_and_login_user(client, db_session, history=["win"], actions=["hit"])
 
     metrics = get_performance_metrics()
     assert isinstance(metrics, dict)
@@ -296,6 +710,23 @@ def test_get_performance_metrics(client, db_session):
         assert key in metrics
 
 
+def test_security_and_performance_metrics_memoized_per_minute(client, db_session, count_queries):
+    create_and_login_user(client, db_session)
+    now = dashboard_now()
+    first = (get_security_metrics(now), get_performance_metrics(now))
+
+    with count_queries() as queries:
+        assert (get_security_metrics(now), get_performance_metrics(now)) == first
+    assert queries == []
+
+    # a login doesn't drop them; the next minute's key picks it up
+    client.get("/logout")
+    client.post("/login", data={"username": "dashboarduser", "password": "pass123"})
+    assert get_security_metrics(now) == first[0]
+    next_minute = now + timedelta(minutes=1)
+    assert get_security_metrics(next_minute)["logins_24h"] == first[0]["logins_24h"] + 1
+
+
 def test_get_code_quality_metrics():
     metrics = get_code_quality_metrics()
     assert isinstance(metrics, dict)
@@ -305,6 +736,61 @@ def test_get_code_quality_metrics():
     assert "code_to_test_ratio" in metrics
 
 
+def test_code_quality_metrics_walk_tree_once(monkeypatch):
+    get_code_quality_metrics()
+    walked = []
+    monkeypatch.setattr("os.walk", lambda *a, **k: walked.append(a) or iter(()))
+    assert get_code_quality_metrics()["total_files"] > 0
+    assert walked == []
+
+
+def test_report_parsers_reread_only_when_file_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    coverage = tmp_path / "coverage.xml"
+    report = tmp_path / "test-report.json"
+
+    coverage.write_text('<coverage line-rate="0.5"/>')
+    report.write_text('{"summary": {"total": 3, "passed": 3}}')
+    os.utime(coverage, ns=(1_000_000_000, 1_000_000_000))
+    os.utime(report, ns=(1_000_000_000, 1_000_000_000))
+    assert get_test_coverage() == 50.0
+    assert get_test_results()["total"] == 3
+
+    # Same mtime: served from the parse cache even though the bytes changed
+    coverage.write_text('<coverage line-rate="0.9"/>')
+    os.utime(coverage, ns=(1_000_000_000, 1_000_000_000))
+    assert get_test_coverage() == 50.0
+
+    # Rewritten file with a new mtime is parsed again
+    report.write_text('{"summary": {"total": 4, "passed": 3, "failed": 1}}')
+    os.utime(coverage, ns=(2_000_000_000, 2_000_000_000))
+    os.utime(report, ns=(2_000_000_000, 2_000_000_000))
+    assert get_test_coverage() == 90.0
+    assert get_test_results()["failed"] == 1
+    # last_run reflects when the report was written
+    assert get_test_results()["last_run"] == "1970-01-01T00:00:02"
+
+
+def test_coverage_reads_only_the_root_element(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # the per-line body is never reached, so even a cut-off report parses
+    (tmp_path / "coverage.xml").write_text(
+        '<coverage line-rate="0.75"><packages><package name="app">'
+    )
+    assert get_test_coverage() == 75.0
+
+
+def test_testing_summary_combines_coverage_and_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert get_testing_summary() == {"coverage": None, "results": None}
+
+    (tmp_path / "coverage.xml").write_text('<coverage line-rate="0.8"/>')
+    (tmp_path / "test-report.json").write_text('{"summary": {"total": 2, "passed": 2}}')
+    summary = get_testing_summary()
+    assert summary["coverage"] == 80.0
+    assert summary["results"]["passed"] == 2
+
+
 def test_get_infrastructure_health():
     health = get_infrastructure_health()
     assert isinstance(health, dict)
@@ -383,12 +869,28 @@ def test_get_action_items_wraps_critical_issues(monkeypatch):
     assert item["completed"] is False
 
 
+def test_get_action_items_orders_by_severity():
+    def issue(title, severity):
+        return {"title": title, "severity": severity, "description": "",
+                "fix": "", "time": ""}
+
+    items = get_action_items([
+        issue("later", "unknown"),
+        issue("soon", "medium"),
+        issue("now", "critical"),
+        issue("next", "high"),
+    ])
+    assert [item["title"] for item in items] == ["now", "next", "soon", "later"]
+    # ids keep the order the issues were reported in
+    assert [item["id"] for item in items] == [3, 4, 2, 1]
+
+
 def test_get_system_health_summary_with_mocked_subhelpers(monkeypatch):
     """Mock heavy helpers so this stays fast and deterministic."""
 
     monkeypatch.setattr(
         "app.get_security_score",
-        lambda: {"percentage": 80.0, "grade": "B", "score": 80, "max_score": 100, "issues": []},
+        lambda now=None: {"percentage": 80.0, "grade": "B", "score": 80, "max_score": 100, "issues": []},
     )
     monkeypatch.setattr("app.get_test_coverage", lambda: 80.0)
     monkeypatch.setattr(
@@ -397,7 +899,7 @@ def test_get_system_health_summary_with_mocked_subhelpers(monkeypatch):
     )
     monkeypatch.setattr(
         "app.get_performance_metrics",
-        lambda: {"total_users": 1, "total_games": 1, "total_actions": 1,
+        lambda now=None: {"total_users": 1, "total_games": 1, "total_actions": 1,
                  "avg_games_per_user": 1.0, "games_last_hour": 1,
                  "actions_last_hour": 1, "activity_rate": 1.0},
     )
@@ -1,13 +1,17 @@
 # tests/test_game.py
 
+from flask import session
+
 from app import (
+    app,
     Card,
     Deck,
     BlackjackGame,
     hand_value,
     format_seconds_hhmmss,
+    FULL_DECK,
     get_game_for_user,
-    GAMES,
+    save_game,
 )
 
 
@@ -22,8 +26,7 @@ def test_deck_has_52_unique_cards():
     assert len(deck.cards) == 52
 
     dealt = [deck.deal() for _ in range(52)]
-    ranks_suits = {(c.rank, c.suit) for c in dealt}
-    assert len(ranks_suits) == 52
+    assert set(dealt) == set(FULL_DECK)
 
     # Deck should now be empty
     assert deck.cards == []
@@ -91,17 +94,68 @@ def test_blackjack_game_player_stand_resolves_game():
     assert "You win" in game.message or "Dealer wins" in game.message or "Push" in game.message
 
 
-def test_get_game_for_user_creates_and_reuses_game():
-    username = "testuser"
-    # Ensure clean
-    GAMES.clear()
+def test_blackjack_game_dealer_draws_past_soft_ace():
+    game = BlackjackGame()
+    # dealt from the end: K makes A+5 a hard 16, so the dealer draws the 5 too
+    game.deck.cards = [Card("5", "clubs"), Card("K", "spades")]
+    game.player_cards = [Card("10", "hearts"), Card("9", "spades")]  # 19
+    game.dealer_cards = [Card("A", "hearts"), Card("5", "diamonds")]  # soft 16
+
+    game.player_stand()
+    assert len(game.dealer_cards) == 4
+    assert hand_value(game.dealer_cards) == 21
+    assert "Dealer wins" in game.message
+
+
+def test_get_game_for_user_creates_and_reuses_game(create_user):
+    user = create_user()
+
+    with app.test_request_context():
+        game1 = get_game_for_user(user.id)
+        assert isinstance(game1, BlackjackGame)
+        # the deck stays on the server, never in the readable session cookie
+        assert "game" not in session
+
+        game2 = get_game_for_user(user.id)
+        # same hand restored from game_state
+        assert game2.to_dict() == game1.to_dict()
 
-    game1 = get_game_for_user(username)
-    assert username in GAMES
-    assert isinstance(game1, BlackjackGame)
 
-    game2 = get_game_for_user(username)
-    assert game1 is game2  # same game object reused
+def test_save_game_persists_state_on_the_server(create_user, db_session):
+    user = create_user()
+
+    with app.test_request_context():
+        game = get_game_for_user(user.id)
+        game.player_hit()
+        save_game(user.id, game)
+        db_session.commit()
+
+        restored = get_game_for_user(user.id)
+        assert len(restored.player_cards) == 3
+        assert len(restored.deck.cards) == 52 - 5
+        assert restored.finished == game.finished
+        assert restored.message == game.message
+
+
+def test_blackjack_game_dict_round_trip():
+    game = BlackjackGame()
+    game.start()
+
+    restored = BlackjackGame.from_dict(game.to_dict())
+    assert [repr(c) for c in restored.player_cards] == [repr(c) for c in game.player_cards]
+    assert [repr(c) for c in restored.dealer_cards] == [repr(c) for c in game.dealer_cards]
+    assert [repr(c) for c in restored.deck.cards] == [repr(c) for c in game.deck.cards]
+    assert restored.finished is False
+
+
+def test_card_id_indexes_full_deck():
+    assert [card.id for card in FULL_DECK] == list(range(52))
+    # cards built outside the deck (e.g. rigged in tests) map to the same slot
+    card = Card("Q", "clubs")
+    assert FULL_DECK[card.id].rank == "Q"
+    assert FULL_DECK[card.id].suit == "clubs"
+    assert card == FULL_DECK[card.id]
+    assert card != Card("Q", "hearts")
 
 
 def test_format_seconds_hhmmss():
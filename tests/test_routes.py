@@ -1,12 +1,13 @@
 # tests/test_routes.py
 
-from werkzeug.security import generate_password_hash
 
-from app import app, db, User, HandHistory, ActionLog
+import threading
+
+from app import app, db, User, HandHistory, ActionLog, ActionLogWriter, UserStats, BlackjackGame, GameState, hash_password, record_hand_result
 
 
 def create_user(db_session, username="player1", password="secret"):
-    pw_hash = generate_password_hash(password)
+    pw_hash = hash_password(password)
     user = User(username=username, password_hash=pw_hash)
     db_session.add(user)
     db_session.commit()
@@ -21,6 +22,15 @@ def login_user(client, username, password):
     )
 
 
+def test_healthz_answers_without_login_or_db(client, count_queries):
+    """/healthz is a bare liveness check for readiness polls."""
+    with count_queries() as queries:
+        resp = client.get("/healthz")
+    assert resp.status_code == 200
+    assert resp.data == b"ok"
+    assert queries == []
+
+
 def test_index_shows_dashboard_for_logged_in_user(client, db_session):
     """GET / should render game page for logged-in user."""
     user = create_user(db_session, "routeuser", "secret")
@@ -32,6 +42,70 @@ def test_index_shows_dashboard_for_logged_in_user(client, db_session):
     assert b"routeuser" in resp.data or b"Blackjack" in resp.data or b"Game" in resp.data
 
 
+def saved_game(db_session, user):
+    return BlackjackGame.from_dict(db_session.get(GameState, user.id).state)
+
+
+def test_index_renders_cards_from_saved_game(client, db_session):
+    """Each card in the saved hand is rendered as 'rank of suit'."""
+    user = create_user(db_session, "viewer", "secret")
+    login_user(client, "viewer", "secret")
+
+    resp = client.get("/")
+    game = saved_game(db_session, user)
+
+    for card in game.player_cards + game.dealer_cards:
+        assert f"{card.rank} of {card.suit}".encode() in resp.data
+
+
+def test_session_cookie_never_carries_the_deck(client, db_session):
+    """The cookie is signed, not encrypted, so the game must not be in it."""
+    create_user(db_session, "peeker", "secret")
+    login_user(client, "peeker", "secret")
+    client.get("/")
+    client.get("/hit")
+
+    with client.session_transaction() as sess:
+        assert "game" not in sess
+        assert not any(isinstance(value, (list, dict)) for value in sess.values())
+
+
+def test_game_continues_on_a_different_client_with_same_cookie(client, db_session):
+    """Game state lives in game_state, so any worker can serve the next
+    action of a hand."""
+    user = create_user(db_session, "roamer", "secret")
+    login_user(client, "roamer", "secret")
+    client.get("/")
+    before = saved_game(db_session, user)
+
+    other_worker = app.test_client()
+    other_worker.set_cookie("session", client.get_cookie("session").value)
+    other_worker.get("/hit")
+    db_session.expire_all()
+    after = saved_game(db_session, user)
+
+    assert [c.id for c in after.player_cards[:2]] == [c.id for c in before.player_cards]
+    assert after.player_cards[2].id == before.deck.cards[-1].id
+
+
+def test_replayed_cookie_cannot_redo_a_hand(client, db_session):
+    """An older copy of the cookie still sees the hand as it is now."""
+    user = create_user(db_session, "replayer", "secret")
+    login_user(client, "replayer", "secret")
+    client.get("/")
+    old_cookie = client.get_cookie("session").value
+    client.get("/stand")
+
+    replay = app.test_client()
+    replay.set_cookie("session", old_cookie)
+    replay.get("/hit")
+    db_session.expire_all()
+
+    game = saved_game(db_session, user)
+    assert game.finished is True
+    assert len(game.player_cards) == 2
+
+
 def test_hit_route_logs_action(client, db_session):
     """GET /hit should log a 'hit' ActionLog for the user."""
     user = create_user(db_session, "hitter", "secret")
@@ -94,3 +168,146 @@ def test_index_stats_counts_wins_losses_pushes(client, db_session):
     # but this at least ensures the route executes with history in place.
     # The presence of "win" / "loss" text is a reasonable heuristic.
     assert b"win" in resp.data.lower() or b"loss" in resp.data.lower() or b"push" in resp.data.lower()
+
+
+def test_stand_keeps_user_stats_in_step_with_history(client, db_session):
+    """Each recorded hand bumps the matching UserStats counter."""
+    user = create_user(db_session, "counter", "secret")
+    # history recorded before user_stats existed
+    db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.commit()
+    login_user(client, "counter", "secret")
+
+    for _ in range(3):
+        client.get("/stand")
+        client.get("/new")
+
+    stats = db_session.get(UserStats, user.id)
+    db_session.refresh(stats)
+    results = [h.result for h in HandHistory.query.filter_by(user_id=user.id)]
+    assert len(results) == 4
+    assert stats.wins == results.count("win")
+    assert stats.losses == results.count("loss")
+    assert stats.pushes == results.count("push")
+
+
+def test_record_hand_result_seeds_user_stats_in_one_upsert(db_session, count_queries):
+    """The first counted hand seeds user_stats from history in one statement."""
+    user_id = create_user(db_session, "seeded", "secret").id
+    db_session.add(HandHistory(user_id=user_id, result="win"))
+    db_session.commit()
+
+    with count_queries() as queries:
+        record_hand_result(user_id, "loss")
+        record_hand_result(user_id, "loss")
+    db_session.commit()
+
+    # history insert + user_stats upsert, per hand
+    assert len(queries) == 4
+    stats = db_session.get(UserStats, user_id)
+    assert (stats.wins, stats.losses, stats.pushes) == (1, 2, 0)
+
+
+def test_upgrade_db_backfills_user_stats(db_session):
+    """`flask upgrade-db` seeds user_stats for history that predates it."""
+    user = create_user(db_session, "veteran", "secret")
+    db_session.add_all([
+        HandHistory(user_id=user.id, result="win"),
+        HandHistory(user_id=user.id, result="push"),
+    ])
+    db_session.commit()
+
+    result = app.test_cli_runner().invoke(args=["upgrade-db"])
+    assert result.exit_code == 0, result.output
+
+    stats = db_session.get(UserStats, user.id)
+    assert (stats.wins, stats.losses, stats.pushes) == (1, 0, 1)
+
+
+def test_index_record_falls_back_to_history(client, db_session):
+    """Without a UserStats row the scoreboard is computed from hand_history."""
+    user = create_user(db_session, "nostats", "secret")
+    db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.add(HandHistory(user_id=user.id, result="win"))
+    db_session.add(HandHistory(user_id=user.id, result="push"))
+    db_session.commit()
+    login_user(client, "nostats", "secret")
+
+    resp = client.get("/")
+    assert b"2 wins / 0 losses / 1 pushes" in resp.data
+
+
+def test_action_log_writer_buffers_until_flush(db_session):
+    """Buffered action logs only reach the database when flushed."""
+    user = create_user(db_session, "buffered", "secret")
+    writer = ActionLogWriter(interval=3600)
+
+    writer.log(user.id, "hit")
+    writer.log(user.id, "stand")
+    assert ActionLog.query.filter_by(user_id=user.id).count() == 0
+
+    assert writer.flush() == 2
+    actions = {log.action for log in ActionLog.query.filter_by(user_id=user.id)}
+    assert actions == {"hit", "stand"}
+    assert writer.flush() == 0
+    writer.stop()
+
+
+def test_action_log_writer_stop_joins_thread_and_flushes(client, db_session, monkeypatch):
+    """With a nonzero interval /hit only queues its log; stop() writes it."""
+    user = create_user(db_session, "stopper", "secret")
+    login_user(client, "stopper", "secret")
+    writer = ActionLogWriter(interval=3600)
+    monkeypatch.setattr("app.action_log_writer", writer)
+
+    client.get("/hit")
+    assert ActionLog.query.filter_by(user_id=user.id, action="hit").count() == 0
+    thread = writer._thread
+    assert thread.is_alive()
+
+    assert writer.stop() == 1
+    assert not thread.is_alive()
+    assert ActionLog.query.filter_by(user_id=user.id, action="hit").count() == 1
+
+    # once stopped, logs are written with the request instead of queued
+    client.get("/stand")
+    assert writer.pending.empty()
+    assert ActionLog.query.filter_by(user_id=user.id, action="stand").count() == 1
+
+
+def test_action_log_writer_thread_flushes_route_logs(client, db_session, monkeypatch):
+    """The background thread writes queued route logs on its own."""
+    user = create_user(db_session, "flusher", "secret")
+    login_user(client, "flusher", "secret")
+    writer = ActionLogWriter(interval=0.01)
+    monkeypatch.setattr("app.action_log_writer", writer)
+
+    flushed = threading.Event()
+    flush = writer.flush
+
+    def flush_and_signal():
+        written = flush()
+        if written:
+            flushed.set()
+        return written
+
+    monkeypatch.setattr(writer, "flush", flush_and_signal)
+
+    client.get("/new")
+    assert flushed.wait(timeout=5)
+    writer.stop()
+    assert ActionLog.query.filter_by(user_id=user.id, action="new_game").count() == 1
+
+
+def test_action_log_writer_writes_through_when_queue_is_full(db_session):
+    """Past max_pending rows, log() stops buffering and writes directly."""
+    user = create_user(db_session, "backlogged", "secret")
+    writer = ActionLogWriter(interval=3600, max_pending=1)
+
+    writer.log(user.id, "hit")
+    writer.log(user.id, "stand")
+    db_session.commit()
+
+    assert [log.action for log in ActionLog.query.filter_by(user_id=user.id)] == ["stand"]
+    assert writer.pending.qsize() == 1
+    writer.stop()